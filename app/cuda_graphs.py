@@ -0,0 +1,59 @@
+from typing import Callable, Dict, Tuple
+
+import torch
+
+
+def batch_buckets(max_batch: int) -> Tuple[int, ...]:
+    """Powers of two up to ``max_batch``, plus ``max_batch`` itself."""
+    return tuple(sorted({min(1 << i, max_batch) for i in range(max_batch.bit_length() + 1)}))
+
+
+class CudaGraphRunner:
+    """Replays CUDA graphs captured from a fixed-shape forward pass.
+
+    One graph is captured per batch-size bucket (powers of two up to
+    ``max_batch``); smaller batches are padded into the nearest bucket.
+    The returned logits alias the graph's static output buffer and are
+    only valid until the next call.
+    """
+
+    def __init__(
+        self,
+        forward: Callable[[torch.Tensor], torch.Tensor],
+        sample: torch.Tensor,
+        max_batch: int,
+        warmup_iters: int = 3,
+        memory_format: torch.memory_format = torch.contiguous_format,
+    ):
+        self.forward = forward
+        self.buckets = batch_buckets(max_batch)
+        self.graphs: Dict[int, Tuple[torch.Tensor, torch.Tensor, torch.cuda.CUDAGraph]] = {}
+        pool = torch.cuda.graph_pool_handle()
+        # Capture largest first so smaller graphs can reuse its pool memory
+        for bucket in reversed(self.buckets):
+            static_input = sample[:1].expand(bucket, *sample.shape[1:]).contiguous(memory_format=memory_format)
+            self.graphs[bucket] = self._capture(static_input, pool, warmup_iters)
+
+    def _capture(self, static_input: torch.Tensor, pool, warmup_iters: int):
+        # Warm up on a side stream so cuBLAS/cuDNN workspaces exist before capture
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            for _ in range(warmup_iters):
+                self.forward(static_input)
+        torch.cuda.current_stream().wait_stream(stream)
+
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph, pool=pool):
+            static_output = self.forward(static_input)
+        return static_input, static_output, graph
+
+    def __call__(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        n = pixel_values.shape[0]
+        bucket = next((b for b in self.buckets if b >= n), None)
+        if bucket is None:
+            raise ValueError(f"Batch size {n} exceeds captured maximum {self.buckets[-1]}")
+        static_input, static_output, graph = self.graphs[bucket]
+        static_input[:n].copy_(pixel_values, non_blocking=True)
+        graph.replay()
+        return static_output[:n]
@@ -1,27 +1,117 @@
-from typing import List, Dict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 
+import asyncio
+import hashlib
 import os
 import io
+import logging
+import threading
 
+# Must be pinned before torch initializes its OpenMP pool
+os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count() or 1))
+
+import numpy as np
 import torch
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse, HTMLResponse
+import torch.nn.functional as F
+from fastapi import FastAPI, File, Request, UploadFile, HTTPException
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from PIL import Image
-from transformers import AutoModelForImageClassification, AutoProcessor
+from torchvision.io import ImageReadMode, decode_jpeg
+from transformers import AutoConfig, AutoModelForImageClassification, AutoProcessor
+
+from app.cuda_graphs import CudaGraphRunner, batch_buckets
+
+try:
+    from turbojpeg import TJPF_RGB, TurboJPEG
 
+    # Raises if the libjpeg-turbo shared library itself is missing
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo_jpeg = None
+
+
+logger = logging.getLogger(__name__)
 
 MODEL_DIR_ENV = "MODEL_DIR"
 DEFAULT_MODEL_DIR = os.getenv(MODEL_DIR_ENV, "my-trained-vit-model")
 
 
+def env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
+QUANTIZE_CPU_ENV = "QUANTIZE_CPU"
+QUANTIZE_CPU = env_flag(QUANTIZE_CPU_ENV, True)
+COMPILE_MODEL_ENV = "COMPILE_MODEL"
+COMPILE_MODEL = env_flag(COMPILE_MODEL_ENV, torch.cuda.is_available())
+CUDA_GRAPHS_ENV = "CUDA_GRAPHS"
+CUDA_GRAPHS = env_flag(CUDA_GRAPHS_ENV, True)
+WARMUP_ITERS = 3
+TRT_ENGINE_ENV = "TRT_ENGINE"
+TRT_ENGINE = os.getenv(TRT_ENGINE_ENV)
+ONNX_MODEL_ENV = "ONNX_MODEL"
+ONNX_MODEL = os.getenv(ONNX_MODEL_ENV)
+# Micro-batching: coalesce concurrent requests into one forward pass
+MAX_BATCH = int(os.getenv("MAX_BATCH", 16))
+MAX_WAIT_S = float(os.getenv("MAX_WAIT_MS", 5)) / 1000.0
+# Concurrent nvJPEG decodes; each holds a full-resolution image in device memory
+GPU_PREPROCESS_SLOTS = threading.BoundedSemaphore(int(os.getenv("GPU_PREPROCESS_CONCURRENCY", 2)))
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", 10)) * 1024 * 1024)
+# Per-image (scores, class ids), sorted by descending score
+Ranking = Tuple[List[float], List[int]]
+# Recent uploads (by content hash) -> ranking; 0 disables the cache
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 512))
+prediction_cache: "OrderedDict[bytes, Ranking]" = OrderedDict()
+
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# NHWC lets cuDNN pick Tensor Core kernels for the patch-embedding conv; the exported
+# TensorRT/ONNX Runtime graphs consume NCHW, so staging them channels-last only adds a transpose
+memory_format = (
+    torch.channels_last
+    if device.type == "cuda" and not (TRT_ENGINE or ONNX_MODEL)
+    else torch.contiguous_format
+)
+# Dynamo cannot trace quantize_dynamic's packed params, so CPU compilation needs FP32 weights
+USE_COMPILE = (
+    COMPILE_MODEL
+    and not (TRT_ENGINE or ONNX_MODEL)
+    and (device.type == "cuda" or not QUANTIZE_CPU)
+)
+
+
 def load_model_and_processor(model_dir: str):
     if not os.path.isdir(model_dir):
         raise FileNotFoundError(f"Model directory not found: {model_dir}")
 
     processor = AutoProcessor.from_pretrained(model_dir)
+    if TRT_ENGINE:
+        # TensorRT is optional; only required when an engine is configured
+        from app.trt_runtime import TrtVitWrapper
+
+        config = AutoConfig.from_pretrained(model_dir)
+        return TrtVitWrapper(TRT_ENGINE, config), processor
+    if ONNX_MODEL:
+        # onnxruntime is optional; only required when an ONNX model is configured
+        from app.ort_runtime import OrtVitWrapper
+
+        config = AutoConfig.from_pretrained(model_dir)
+        return OrtVitWrapper(ONNX_MODEL, config), processor
+
     model = AutoModelForImageClassification.from_pretrained(model_dir)
 
     model.eval()
+    if not torch.cuda.is_available():
+        torch.set_num_threads(os.cpu_count() or 1)
+        if QUANTIZE_CPU:
+            # INT8 weights for nn.Linear only; LayerNorm/GELU stay in FP32
+            model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
     return model, processor
 
 
@@ -45,15 +135,352 @@ def get_id2label(model) -> Dict[int, str]:
     return {0: "CNV", 1: "DME", 2: "DRUSEN", 3: "NORMAL"}
 
 
-app = FastAPI(title="Retina Disease Classification API", version="1.0.0")
+app = FastAPI(
+    title="Retina Disease Classification API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 
 @app.on_event("startup")
 def _startup():
-    global model, processor, id2label
+    global model, processor, id2label, id2label_list, cpu_preprocess, gpu_preprocess, staging, infer_pool
+    global pad_buckets, input_dtype, MAX_BATCH
+    # Serving only: no autograd anywhere (thread-local, covers the event loop thread)
+    torch.set_grad_enabled(False)
+    # Input shape is fixed, so let cuDNN autotune once and allow TF32 matmuls
+    torch.backends.cudnn.benchmark = True
+    torch.backends.cuda.matmul.allow_tf32 = True
+    # A single worker serializes accelerator access and keeps forwards off the event loop
+    infer_pool = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="inference", initializer=torch.set_grad_enabled, initargs=(False,)
+    )
+
     model_dir = DEFAULT_MODEL_DIR
     model, processor = load_model_and_processor(model_dir)
+    prediction_cache.clear()
     id2label = get_id2label(model)
+    # Dense, index-addressable labels for the per-request hot path
+    id2label_list = tuple(id2label.get(i, str(i)) for i in range(max(id2label) + 1))
+    cpu_preprocess = build_cpu_preprocess(processor)
+    if cpu_preprocess is not None and not cpu_preprocess_matches(processor):
+        logger.warning("Specialized CPU preprocessing disagrees with the processor; using the processor")
+        cpu_preprocess = None
+    gpu_preprocess = build_gpu_preprocess(processor)
+    if gpu_preprocess is not None and not gpu_preprocess_matches(processor):
+        logger.warning("GPU preprocessing disagrees with the processor; decoding on CPU instead")
+        gpu_preprocess = None
+    if TRT_ENGINE:
+        MAX_BATCH = min(MAX_BATCH, model.max_batch)
+    elif not ONNX_MODEL:
+        # Processor stays on CPU; only the model lives on the accelerator
+        model = model.to(device, memory_format=memory_format).eval()
+        for p in model.parameters():
+            p.requires_grad_(False)
+    # One input dtype for staging, warmup and graph capture, so compiled graphs never see
+    # a dtype at serving time they were not warmed up with. HF models run FP16 under
+    # autocast on GPU; exported runtimes declare their own input dtype
+    default_dtype = torch.float16 if device.type == "cuda" else torch.float32
+    input_dtype = getattr(model, "input_dtype", default_dtype)
+    staging = build_staging_buffers(processor, input_dtype)
+    # A compiled model specializes on batch size: pad every batch to a bucket warmed up at startup
+    pad_buckets = batch_buckets(MAX_BATCH) if USE_COMPILE else None
+    # Compile/capture on the thread that serves requests: cudagraph state is per-thread
+    model = infer_pool.submit(prepare_model, model, processor).result()
+
+
+def prepare_model(model, processor):
+    if TRT_ENGINE or ONNX_MODEL:
+        warmup(model, processor)
+    elif USE_COMPILE:
+        if device.type == "cuda":
+            # "reduce-overhead" also captures CUDA graphs for the fixed 224x224 input
+            model = torch.compile(model, mode="reduce-overhead", fullgraph=True, dynamic=False)
+        else:
+            model = torch.compile(model, dynamic=False)
+        warmup(model, processor, batch_buckets(MAX_BATCH))
+    elif CUDA_GRAPHS and device.type == "cuda":
+        # Without torch.compile, capture the eager forward into CUDA graphs by hand
+        eager = model
+        model = CudaGraphRunner(
+            lambda pixel_values: run_model(eager, {"pixel_values": pixel_values}),
+            sample_pixel_values(processor).to(device, dtype=input_dtype),
+            MAX_BATCH,
+            warmup_iters=WARMUP_ITERS,
+            memory_format=memory_format,
+        )
+    return model
+
+
+def run_model(model, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+    # No autocast weight cache: graph capture must not depend on per-context buffers
+    with torch.inference_mode(), torch.autocast(
+        device_type=device.type, dtype=torch.float16, enabled=device.type == "cuda", cache_enabled=False
+    ):
+        outputs = model(**inputs)
+    # Exported runtimes and graph runners return logits directly; HF models wrap them
+    return getattr(outputs, "logits", outputs)
+
+
+def sample_pixel_values(processor) -> torch.Tensor:
+    return processor(images=Image.new("RGB", (224, 224)), return_tensors="pt")["pixel_values"]
+
+
+def warmup(model, processor, sizes=(1,)) -> None:
+    # Trigger compilation (one graph per batch size) before the first request instead of on it
+    sample = sample_pixel_values(processor).to(device, dtype=input_dtype)
+    for size in sizes:
+        batch = sample.expand(size, *sample.shape[1:]).contiguous(memory_format=memory_format)
+        for _ in range(WARMUP_ITERS):
+            run_model(model, {"pixel_values": batch})
+
+
+def fixed_preprocess_params(processor):
+    """Resize/normalize constants, or None unless the processor is a plain
+    fixed-size resize -> rescale -> normalize pipeline."""
+    size = getattr(processor, "size", None) or {}
+    flags = ("do_resize", "do_rescale", "do_normalize")
+    if "height" not in size or "width" not in size or not all(getattr(processor, f, False) for f in flags):
+        return None
+    if getattr(processor, "do_center_crop", False):
+        # Resize-then-crop pipelines (e.g. DeiT 256 -> 224) are left to the processor
+        return None
+    # Fold rescale into mean/std so normalization is a single subtract + divide
+    scale = processor.rescale_factor
+    mean = np.asarray(processor.image_mean, dtype=np.float32) / scale
+    std = np.asarray(processor.image_std, dtype=np.float32) / scale
+    resample = getattr(processor, "resample", None)
+    if resample is None:
+        resample = Image.BILINEAR
+    return (size["height"], size["width"]), resample, mean, std
+
+
+def build_cpu_preprocess(processor):
+    return fixed_preprocess_params(processor)
+
+
+def preprocess_on_cpu(image) -> torch.Tensor:
+    (height, width), resample, mean, std = cpu_preprocess
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    a = np.asarray(image.resize((width, height), resample), dtype=np.float32)
+    a -= mean
+    a /= std
+    return torch.from_numpy(np.ascontiguousarray(a.transpose(2, 0, 1)[None]))
+
+
+def parity_image() -> Image.Image:
+    # Non-square noise so resizing and normalization are both exercised
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 256, size=(300, 260, 3), dtype=np.uint8))
+
+
+def cpu_preprocess_matches(processor, atol: float = 1e-3) -> bool:
+    image = parity_image()
+    expected = processor(images=image, return_tensors="pt")["pixel_values"]
+    try:
+        actual = preprocess_on_cpu(image)
+    except Exception:
+        logger.warning("Specialized CPU preprocessing failed its parity check", exc_info=True)
+        return False
+    return actual.shape == expected.shape and torch.allclose(actual, expected, atol=atol)
+
+
+# PIL filters F.interpolate can approximate (with antialiasing)
+_GPU_RESIZE_MODES = {Image.BILINEAR: "bilinear", Image.BICUBIC: "bicubic"}
+
+
+def build_gpu_preprocess(processor):
+    params = fixed_preprocess_params(processor)
+    if device.type != "cuda" or params is None:
+        return None
+    size, resample, mean, std = params
+    mode = _GPU_RESIZE_MODES.get(resample)
+    if mode is None:
+        return None
+    mean = torch.from_numpy(mean).to(device).view(1, 3, 1, 1)
+    std = torch.from_numpy(std).to(device).view(1, 3, 1, 1)
+    return size, mode, mean, std
+
+
+def gpu_preprocess_matches(processor, tol: float = 0.05) -> bool:
+    # nvJPEG and F.interpolate are not bit-exact with libjpeg/PIL: compare mean error
+    buf = io.BytesIO()
+    parity_image().save(buf, format="JPEG", quality=95)
+    content = buf.getvalue()
+    expected = processor(images=Image.open(io.BytesIO(content)).convert("RGB"), return_tensors="pt")["pixel_values"]
+    try:
+        actual = preprocess_on_gpu(content).cpu()
+    except Exception:
+        # e.g. torchvision built without nvJPEG, or a decode error on this device
+        logger.warning("GPU preprocessing failed its parity check", exc_info=True)
+        return False
+    return actual.shape == expected.shape and (actual - expected).abs().mean().item() < tol
+
+
+def build_staging_buffers(processor, dtype: torch.dtype):
+    if device.type != "cuda":
+        return None
+    shape = sample_pixel_values(processor).shape[1:]
+    # Stable pinned host + device buffers: DMA-able H2D copies, no per-batch allocation
+    host_buf = torch.zeros(
+        (MAX_BATCH, *shape), dtype=dtype, pin_memory=True, memory_format=memory_format
+    )
+    dev_buf = torch.zeros_like(host_buf, device=device)
+    return host_buf, dev_buf
+
+
+def preprocess_on_gpu(content: bytes) -> torch.Tensor:
+    (height, width), mode, mean, std = gpu_preprocess
+    data = torch.frombuffer(bytearray(content), dtype=torch.uint8)
+    img = decode_jpeg(data, mode=ImageReadMode.RGB, device=device)
+    img = F.interpolate(
+        img.unsqueeze(0).float(), size=(height, width), mode=mode, align_corners=False, antialias=True
+    )
+    return img.sub_(mean).div_(std)
+
+
+def is_jpeg(content: bytes) -> bool:
+    return content[:3] == b"\xff\xd8\xff"
+
+
+def within_pixel_limit(content: bytes) -> bool:
+    # Same decompression-bomb bound PIL enforces, checked from the header before decoding
+    limit = Image.MAX_IMAGE_PIXELS
+    if limit is None:
+        return True
+    try:
+        if turbo_jpeg is not None and is_jpeg(content):
+            width, height, _, _ = turbo_jpeg.decode_header(content)
+        else:
+            with Image.open(io.BytesIO(content)) as img:
+                width, height = img.size
+    except Exception:
+        return False
+    return width * height <= limit
+
+
+def decode_image(content: bytes):
+    if turbo_jpeg is not None and is_jpeg(content):
+        try:
+            # SIMD libjpeg-turbo decode straight to an HWC RGB array
+            return turbo_jpeg.decode(content, pixel_format=TJPF_RGB)
+        except Exception:
+            pass
+    try:
+        return Image.open(io.BytesIO(content)).convert("RGB")
+    except Exception:
+        return None
+
+
+def preprocess(content: bytes) -> Optional[torch.Tensor]:
+    # Checked up front so neither the GPU nor the CPU decoder sees an oversized image
+    if not within_pixel_limit(content):
+        return None
+    if gpu_preprocess is not None and is_jpeg(content):
+        try:
+            with GPU_PREPROCESS_SLOTS:
+                return preprocess_on_gpu(content)
+        except Exception:
+            # nvJPEG rejected it (e.g. progressive/CMYK): use the CPU path below
+            pass
+    image = decode_image(content)
+    if image is None:
+        return None
+    if cpu_preprocess is not None:
+        return preprocess_on_cpu(image)
+    return processor(images=image, return_tensors="pt")["pixel_values"]
+
+
+def padded_size(n: int) -> int:
+    if pad_buckets is None:
+        return n
+    return next(b for b in pad_buckets if b >= n)
+
+
+def stage_batch(pixel_values: List[torch.Tensor], size: int) -> torch.Tensor:
+    """Stack ``pixel_values`` on the device, padded with rows of zeros up to ``size``."""
+    n = len(pixel_values)
+    # Processors without a fixed output size cannot use the preallocated buffers
+    if staging is None or any(pv.shape[1:] != staging[0].shape[1:] for pv in pixel_values):
+        rows = [pv.to(device, dtype=input_dtype, non_blocking=True) for pv in pixel_values]
+        if size > n:
+            rows.append(rows[0].new_zeros((size - n, *rows[0].shape[1:])))
+        return torch.cat(rows).contiguous(memory_format=memory_format)
+    host_buf, dev_buf = staging
+    cpu_rows = [i for i, pv in enumerate(pixel_values) if not pv.is_cuda]
+    for i in cpu_rows:
+        host_buf[i].copy_(pixel_values[i][0])
+    if len(cpu_rows) == n:
+        dev_buf[:n].copy_(host_buf[:n], non_blocking=True)
+    else:
+        for i, pv in enumerate(pixel_values):
+            src = host_buf[i] if not pv.is_cuda else pv[0]
+            dev_buf[i].copy_(src, non_blocking=True)
+    # Rows past n are left over from earlier batches; their outputs are discarded
+    return dev_buf[:size]
+
+
+def forward_batch(pixel_values: List[torch.Tensor]) -> List[Ranking]:
+    # Staging buffers are safe to reuse: the trailing sync completes before the next batch
+    n = len(pixel_values)
+    batch = stage_batch(pixel_values, padded_size(n))
+    # FP32 logits so the softmax stays numerically stable
+    logits = run_model(model, {"pixel_values": batch})[:n].float()
+    # Rank and score the whole batch on-device (top_k varies per request, so keep all
+    # classes), then copy both back asynchronously and sync once
+    scores, indices = logits.softmax(dim=-1).sort(dim=-1, descending=True)
+    scores = scores.to("cpu", non_blocking=True)
+    indices = indices.to("cpu", non_blocking=True)
+    if logits.is_cuda:
+        torch.cuda.current_stream().synchronize()
+    return list(zip(scores.tolist(), indices.tolist()))
+
+
+@app.on_event("startup")
+async def _start_batch_worker():
+    global batch_queue, batch_task
+    batch_queue = asyncio.Queue()
+    batch_task = asyncio.create_task(batch_worker())
+
+
+@app.on_event("shutdown")
+async def _stop_batch_worker():
+    batch_task.cancel()
+    infer_pool.shutdown(wait=False)
+
+
+async def batch_worker() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await batch_queue.get()]
+        deadline = loop.time() + MAX_WAIT_S
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(batch_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        futures = [fut for _, fut in batch]
+        try:
+            rankings = await loop.run_in_executor(infer_pool, forward_batch, [pv for pv, _ in batch])
+        except Exception as exc:
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(exc)
+            continue
+        for i, fut in enumerate(futures):
+            if not fut.done():
+                fut.set_result(rankings[i])
+
+
+async def infer(pixel_values: torch.Tensor) -> Ranking:
+    fut = asyncio.get_running_loop().create_future()
+    await batch_queue.put((pixel_values, fut))
+    return await fut
 
 
 @app.get("/health")
@@ -67,10 +494,8 @@ def labels() -> Dict[str, str]:
     return {str(k): v for k, v in id2label.items()}
 
 
-@app.get("/")
-def index_form() -> HTMLResponse:
-    html = (
-        """
+# Static page: encode and hash once at import instead of per request
+_INDEX_HTML = """
         <html lang="en">
           <head>
             <meta charset="utf-8" />
@@ -267,21 +692,26 @@ def index_form() -> HTMLResponse:
           </body>
         </html>
         """
-    )
-    return HTMLResponse(content=html)
+_INDEX_HTML_BYTES = _INDEX_HTML.encode("utf-8")
+_INDEX_ETAG = f'"{hashlib.sha1(_INDEX_HTML_BYTES).hexdigest()}"'
+_INDEX_HEADERS = {"Cache-Control": "public, max-age=3600", "ETag": _INDEX_ETAG}
 
 
-def softmax(logits: torch.Tensor) -> torch.Tensor:
-    return torch.nn.functional.softmax(logits, dim=-1)
+@app.get("/", response_class=HTMLResponse)
+def index_form(request: Request) -> Response:
+    if request.headers.get("if-none-match") == _INDEX_ETAG:
+        return Response(status_code=304, headers=_INDEX_HEADERS)
+    return Response(content=_INDEX_HTML_BYTES, media_type="text/html", headers=_INDEX_HEADERS)
 
 
-def format_predictions(probs: torch.Tensor, top_k: int = 3) -> List[Dict[str, float]]:
-    top_k = max(1, min(top_k, probs.shape[-1]))
-    values, indices = torch.topk(probs, k=top_k)
+def format_predictions(ranking: Ranking, top_k: int = 3) -> List[Dict[str, float]]:
+    scores, indices = ranking
+    top_k = max(1, min(top_k, len(scores)))
+    n_labels = len(id2label_list)
     results: List[Dict[str, float]] = []
-    for score, idx in zip(values.tolist(), indices.tolist()):
-        label = id2label.get(int(idx), str(idx))
-        results.append({"label": label, "score": float(score)})
+    for score, idx in zip(scores[:top_k], indices[:top_k]):
+        label = id2label_list[idx] if idx < n_labels else str(idx)
+        results.append({"label": label, "score": score})
     return results
 
 
@@ -290,19 +720,32 @@ async def predict(file: UploadFile = File(...), top_k: int = 3):
     if file.content_type is None or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
-    content = await file.read()
-    try:
-        image = Image.open(io.BytesIO(content)).convert("RGB")
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid image file")
-
-    with torch.no_grad():
-        inputs = processor(images=image, return_tensors="pt")
-        outputs = model(**inputs)
-        probs = softmax(outputs.logits.squeeze(0))
-
-    preds = format_predictions(probs, top_k=top_k)
-    return JSONResponse({"predictions": preds})
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image file too large")
+    # Bounded read: never buffer more than the limit, even if size was not reported
+    content = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(content) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image file too large")
+    key = None
+    ranking = None
+    if PREDICTION_CACHE_SIZE > 0:
+        key = hashlib.blake2b(content, digest_size=16).digest()
+        ranking = prediction_cache.get(key)
+    if ranking is not None:
+        prediction_cache.move_to_end(key)
+    else:
+        # Decode/resize off the event loop so other requests keep flowing
+        pixel_values = await asyncio.get_running_loop().run_in_executor(None, preprocess, content)
+        if pixel_values is None:
+            raise HTTPException(status_code=400, detail="Invalid image file")
+
+        ranking = await infer(pixel_values)
+        if key is not None:
+            prediction_cache[key] = ranking
+            if len(prediction_cache) > PREDICTION_CACHE_SIZE:
+                prediction_cache.popitem(last=False)
+    preds = format_predictions(ranking, top_k=top_k)
+    return {"predictions": preds}
 
 
 if __name__ == "__main__":
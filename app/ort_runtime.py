@@ -0,0 +1,51 @@
+import numpy as np
+import onnxruntime as ort
+import torch
+
+
+class OrtVitWrapper:
+    """Runs an exported ONNX ViT with ONNX Runtime and returns raw logits.
+
+    Uses the CUDA execution provider when available; CUDA inputs are bound
+    in place via IO binding instead of being round-tripped through NumPy.
+    """
+
+    def __init__(self, onnx_path: str, config):
+        self.config = config
+        wanted = [
+            ("CUDAExecutionProvider", {"cudnn_conv_algo_search": "EXHAUSTIVE"}),
+            "CPUExecutionProvider",
+        ]
+        available = set(ort.get_available_providers())
+        providers = [p for p in wanted if (p[0] if isinstance(p, tuple) else p) in available]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+        self.on_cuda = "CUDAExecutionProvider" in self.session.get_providers()
+        # The graph is exported in FP32 / NCHW
+        self.input_dtype = torch.float32
+
+    def __call__(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        pixel_values = pixel_values.to(self.input_dtype).contiguous()
+        if self.on_cuda and pixel_values.is_cuda:
+            binding = self.session.io_binding()
+            binding.bind_input(
+                self.input_name,
+                "cuda",
+                pixel_values.device.index or 0,
+                np.float32,
+                tuple(pixel_values.shape),
+                pixel_values.data_ptr(),
+            )
+            binding.bind_output(self.output_name, "cuda")
+            # ORT runs on its own stream; make sure the input is fully written
+            torch.cuda.current_stream().synchronize()
+            self.session.run_with_iobinding(binding)
+            logits = binding.copy_outputs_to_cpu()[0]
+        else:
+            feed = {self.input_name: pixel_values.cpu().numpy()}
+            logits = self.session.run([self.output_name], feed)[0]
+        return torch.from_numpy(logits)
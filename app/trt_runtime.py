@@ -0,0 +1,73 @@
+from typing import Tuple
+
+import tensorrt as trt
+import torch
+
+
+_TRT_TO_TORCH_DTYPE = {
+    trt.float32: torch.float32,
+    trt.float16: torch.float16,
+    trt.bfloat16: torch.bfloat16,
+}
+
+
+class TrtVitWrapper:
+    """Runs a serialized TensorRT ViT engine and returns raw logits.
+
+    Input and output device buffers are allocated once for the engine's
+    maximum batch size and reused across calls.
+    """
+
+    def __init__(self, engine_path: str, config):
+        self.config = config
+        self._logger = trt.Logger(trt.Logger.WARNING)
+        with open(engine_path, "rb") as f:
+            self.engine = trt.Runtime(self._logger).deserialize_cuda_engine(f.read())
+        if self.engine is None:
+            raise RuntimeError(f"Failed to deserialize TensorRT engine: {engine_path}")
+        self.context = self.engine.create_execution_context()
+
+        names = [self.engine.get_tensor_name(i) for i in range(self.engine.num_io_tensors)]
+        self.input_name = next(
+            n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.INPUT
+        )
+        self.output_name = next(
+            n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.OUTPUT
+        )
+
+        input_shape = self._max_shape(self.input_name)
+        self.max_batch = input_shape[0]
+        self.context.set_input_shape(self.input_name, input_shape)
+        output_shape = tuple(self.context.get_tensor_shape(self.output_name))
+
+        self._input = torch.empty(
+            input_shape,
+            dtype=_TRT_TO_TORCH_DTYPE[self.engine.get_tensor_dtype(self.input_name)],
+            device="cuda",
+        )
+        self._output = torch.empty(
+            output_shape,
+            dtype=_TRT_TO_TORCH_DTYPE[self.engine.get_tensor_dtype(self.output_name)],
+            device="cuda",
+        )
+        self.input_dtype = self._input.dtype
+        self.context.set_tensor_address(self.input_name, self._input.data_ptr())
+        self.context.set_tensor_address(self.output_name, self._output.data_ptr())
+
+    def _max_shape(self, name: str) -> Tuple[int, ...]:
+        shape = tuple(self.engine.get_tensor_shape(name))
+        if -1 in shape:
+            # Dynamic batch: size buffers for the optimization profile's max
+            shape = tuple(self.engine.get_tensor_profile_shape(name, 0)[2])
+        return shape
+
+    def __call__(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        n = pixel_values.shape[0]
+        if n > self.max_batch:
+            raise ValueError(f"Batch size {n} exceeds engine maximum {self.max_batch}")
+        self._input[:n].copy_(pixel_values)
+        self.context.set_input_shape(self.input_name, tuple(self._input[:n].shape))
+        if not self.context.execute_async_v3(torch.cuda.current_stream().cuda_stream):
+            raise RuntimeError("TensorRT engine execution failed")
+        # Copy out so the next call cannot overwrite the returned logits
+        return self._output[:n].to(torch.float32, copy=True)
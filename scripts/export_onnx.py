@@ -0,0 +1,60 @@
+import argparse
+import os
+import shutil
+import subprocess
+
+import torch
+from transformers import AutoModelForImageClassification
+
+from export_trt import LogitsOnly
+
+
+def simplify(path: str) -> None:
+    try:
+        import onnx
+        from onnxsim import simplify as onnxsim_simplify
+    except ImportError:
+        print("onnxsim not installed; skipping simplification")
+        return
+    model, ok = onnxsim_simplify(onnx.load(path))
+    if ok:
+        onnx.save(model, path)
+
+
+def fold_constants(path: str) -> None:
+    if shutil.which("polygraphy") is None:
+        print("polygraphy not installed; skipping constant folding")
+        return
+    subprocess.run(
+        ["polygraphy", "surgeon", "sanitize", path, "--fold-constants", "-o", path],
+        check=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the ViT classifier to ONNX for ONNX Runtime")
+    parser.add_argument("--model-dir", default=os.getenv("MODEL_DIR", "my-trained-vit-model"))
+    parser.add_argument("--onnx", default="vit.onnx")
+    parser.add_argument("--image-size", type=int, default=224)
+    args = parser.parse_args()
+
+    model = AutoModelForImageClassification.from_pretrained(args.model_dir).eval()
+    dummy = torch.randn(1, 3, args.image_size, args.image_size)
+    with torch.inference_mode():
+        torch.onnx.export(
+            LogitsOnly(model),
+            (dummy,),
+            args.onnx,
+            opset_version=17,
+            input_names=["pixel_values"],
+            output_names=["logits"],
+            dynamic_axes={"pixel_values": {0: "B"}, "logits": {0: "B"}},
+        )
+
+    simplify(args.onnx)
+    fold_constants(args.onnx)
+    print(f"Saved ONNX model to {args.onnx}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import os
+import subprocess
+
+import torch
+from PIL import Image
+from transformers import AutoModelForImageClassification, AutoProcessor
+
+
+PRECISIONS = ("fp16", "fp8", "nvfp4")
+
+
+class LogitsOnly(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values).logits
+
+
+def load_calibration(model_dir: str, calib_dir: str, limit: int = 64) -> torch.Tensor:
+    processor = AutoProcessor.from_pretrained(model_dir)
+    paths = sorted(os.listdir(calib_dir))[:limit]
+    images = [Image.open(os.path.join(calib_dir, p)).convert("RGB") for p in paths]
+    return processor(images=images, return_tensors="pt")["pixel_values"].cuda().half()
+
+
+def quantize(model, precision: str, calib: torch.Tensor):
+    # FP8 / NVFP4 need explicit Q/DQ nodes in the ONNX graph (Hopper / Blackwell)
+    import modelopt.torch.quantization as mtq
+
+    cfg = mtq.FP8_DEFAULT_CFG if precision == "fp8" else mtq.NVFP4_DEFAULT_CFG
+
+    def forward_loop(m):
+        for batch in calib.split(8):
+            m(batch)
+
+    return mtq.quantize(model, cfg, forward_loop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the ViT classifier to a TensorRT engine")
+    parser.add_argument("--model-dir", default=os.getenv("MODEL_DIR", "my-trained-vit-model"))
+    parser.add_argument("--onnx", default="vit.onnx")
+    parser.add_argument("--engine", default="vit.engine")
+    parser.add_argument("--precision", choices=PRECISIONS, default=os.getenv("TRT_PRECISION", "fp16"))
+    parser.add_argument("--image-size", type=int, default=224)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--calib-dir", help="Directory of sample OCT images (required for fp8/nvfp4)")
+    args = parser.parse_args()
+    if args.precision != "fp16" and not args.calib_dir:
+        parser.error(f"--calib-dir is required for {args.precision}")
+
+    model = AutoModelForImageClassification.from_pretrained(args.model_dir).eval().cuda()
+    # Half first: with --stronglyTyped, layers left unquantized (LayerNorm, softmax,
+    # GELU, residuals) keep the ONNX dtype, so an FP32 export would run them in FP32
+    wrapped = LogitsOnly(model).half()
+    if args.precision != "fp16":
+        calib = load_calibration(args.model_dir, args.calib_dir)
+        wrapped = quantize(wrapped, args.precision, calib)
+
+    dummy = torch.randn(1, 3, args.image_size, args.image_size, device="cuda", dtype=torch.float16)
+    with torch.inference_mode():
+        torch.onnx.export(
+            wrapped,
+            (dummy,),
+            args.onnx,
+            opset_version=17,
+            input_names=["pixel_values"],
+            output_names=["logits"],
+            dynamic_axes={"pixel_values": {0: "B"}, "logits": {0: "B"}},
+        )
+
+    shape = f"3x{args.image_size}x{args.image_size}"
+    # Precision comes from the ONNX types (FP16 weights or Q/DQ nodes)
+    subprocess.run(
+        [
+            "trtexec",
+            f"--onnx={args.onnx}",
+            f"--saveEngine={args.engine}",
+            "--stronglyTyped",
+            f"--minShapes=pixel_values:1x{shape}",
+            f"--optShapes=pixel_values:1x{shape}",
+            f"--maxShapes=pixel_values:{args.max_batch}x{shape}",
+        ],
+        check=True,
+    )
+    print(f"Saved TensorRT engine to {args.engine}")
+
+
+if __name__ == "__main__":
+    main()